@@ -0,0 +1,44 @@
+"""Built-in styles for terminal widget"""
+from __future__ import annotations
+
+# Styles format:
+# {yourstylename}: dict[str] = {
+#    "background": "{yourhexcolor}",
+#    "insertbackground": "{yourhexcolor}",
+#    "selectbackground": "{yourhexcolor}",
+#    "selectforeground": "{yourhexcolor}",
+#    "foreground": "{yourhexcolor}",
+# }
+
+# Built-in styles
+DEFAULT: dict[str] = {  # Style for normal tkterminalwidget
+    "background": "#2B2B2B",
+    "insertbackground": "#DCDCDC",
+    "selectbackground": "#b4b3b3",
+    "selectforeground": "#e6e6e6",
+    "foreground": "#cccccc",
+}
+
+POWERSHELL: dict[str] = {  # Style for powershell
+    "background": "#012456",
+    "insertbackground": "#eeedf0",
+    "selectbackground": "#fedba9",
+    "selectforeground": "#11120f",
+    "foreground": "#cccccc",
+}
+
+COMMAND: dict[str] = {  # Style for normal "cmd.exe"
+    "background": "#000000",
+    "insertbackground": "#f2f2f2",
+    "selectbackground": "#f3f3f3",
+    "selectforeground": "#000000",
+    "foreground": "#f2f2f2",
+}
+
+GIT: dict[str] = {  # Style for "git.exe"
+    "background": "#000000",
+    "insertbackground": "#bfbfbf",
+    "selectbackground": "#bfbfbf",
+    "selectforeground": "#0E0E0E",
+    "foreground": "#efefef",
+}
@@ -4,57 +4,24 @@ from __future__ import annotations
 from json import dump, load
 from pathlib import Path
 from re import match
-from tkinter import Event, Frame, Text, Tk
+from tkinter import Frame, StringVar, Tk
 from tkinter.colorchooser import askcolor
 from tkinter.ttk import Button, Entry, Label
 
 from platformdirs import user_cache_dir
 
+dev: bool = not __package__  # Run from inside the package directory
+if dev:
+    from constants import COMMAND, DEFAULT, GIT, POWERSHELL  # noqa: F401
+    from tkterm import SIGN, Terminal
+else:
+    from .constants import COMMAND, DEFAULT, GIT, POWERSHELL  # noqa: F401
+    from .tkterm import SIGN, Terminal
+
 # Constants
 STYLE_PATH = Path(user_cache_dir("tktermwidget"))
 JSON_FILE = STYLE_PATH / "styles.json"
-
-# Styles format:
-# {yourstylename}: dict[str] = {
-#    "background": "{yourhexcolor}",
-#    "insertbackground": "{yourhexcolor}",
-#    "selectbackground": "{yourhexcolor}",
-#    "selectforeground": "{yourhexcolor}",
-#    "foreground": "{yourhexcolor}",
-# }
-
-# Built-in styles
-DEFAULT: dict[str] = {  # Style for normal tkterminalwidget
-    "background": "#2B2B2B",
-    "insertbackground": "#DCDCDC",
-    "selectbackground": "#b4b3b3",
-    "selectforeground": "#e6e6e6",
-    "foreground": "#cccccc",
-}
-
-POWERSHELL: dict[str] = {  # Style for powershell
-    "background": "#012456",
-    "insertbackground": "#eeedf0",
-    "selectbackground": "#fedba9",
-    "selectforeground": "#11120f",
-    "foreground": "#cccccc",
-}
-
-COMMAND: dict[str] = {  # Style for normal "cmd.exe"
-    "background": "#000000",
-    "insertbackground": "#f2f2f2",
-    "selectbackground": "#f3f3f3",
-    "selectforeground": "#000000",
-    "foreground": "#f2f2f2",
-}
-
-GIT: dict[str] = {  # Style for "git.exe"
-    "background": "#000000",
-    "insertbackground": "#bfbfbf",
-    "selectbackground": "#bfbfbf",
-    "selectforeground": "#0E0E0E",
-    "foreground": "#efefef",
-}
+RENDER_DELAY = 100  # Milliseconds to wait after the last change before rendering
 
 # Check the style file
 if not STYLE_PATH.exists():
@@ -109,10 +76,10 @@ class Config(Tk):
                 self.withdraw()
                 self.deiconify()
 
-        self.style: dict[str] = basedon if basedon != DEFAULT else load_style() if load_style() != {} else DEFAULT
+        self.style: dict[str] = dict(basedon if basedon != DEFAULT else load_style() if load_style() != {} else DEFAULT)
+        self.rendering: str | None = None
 
         # Color choose or input widgets
-        # TODO: check the hex color is it vaild
         buttonframe = Frame(self)
         save = Button(buttonframe, text="Save", width=6, command=self.savestyle)
         cancel = Button(buttonframe, text="Cancel", width=6, command=self.destroy)
@@ -121,14 +88,14 @@ class Config(Tk):
         backgroundframe = Frame(self)
         background = Label(backgroundframe, text="Choose or input your normalbackground hex color")
         backgroundentry = Entry(backgroundframe)
-        backgroundbutton = Button(backgroundframe, command=lambda: self.selectcolor(backgroundentry, "background"))
+        backgroundbutton = Button(backgroundframe, command=lambda: self.selectcolor("background"))
 
         insertbackgroundframe = Frame(self)
         insertbackground = Label(insertbackgroundframe, text="Choose or input your insertbackground hex color")
         insertbackgroundentry = Entry(insertbackgroundframe)
         insertbackgroundbutton = Button(
             insertbackgroundframe,
-            command=lambda: self.selectcolor(insertbackgroundentry, "insertbackground"),
+            command=lambda: self.selectcolor("insertbackground"),
         )
 
         selectbackgroundframe = Frame(self)
@@ -136,7 +103,7 @@ class Config(Tk):
         selectbackgroundentry = Entry(selectbackgroundframe)
         selectbackgroundbutton = Button(
             selectbackgroundframe,
-            command=lambda: self.selectcolor(selectbackgroundentry, "selectbackground"),
+            command=lambda: self.selectcolor("selectbackground"),
         )
 
         selectforegroundframe = Frame(self)
@@ -144,33 +111,33 @@ class Config(Tk):
         selectforegroundentry = Entry(selectforegroundframe)
         selectforegroundbutton = Button(
             selectforegroundframe,
-            command=lambda: self.selectcolor(selectforegroundentry, "selectforeground"),
+            command=lambda: self.selectcolor("selectforeground"),
         )
 
         foregroundframe = Frame(self)
         foreground = Label(foregroundframe, text="Choose or input your selectforeground hex color")
         foregroundentry = Entry(foregroundframe)
-        foregroundbutton = Button(foregroundframe, command=lambda: self.selectcolor(foregroundentry, "foreground"))
+        foregroundbutton = Button(foregroundframe, command=lambda: self.selectcolor("foreground"))
 
         # Style render configs
-        self.render = Text(
-            self,
-            width=40,
-            background=self.style["background"],
-            insertbackground=self.style["insertbackground"],
-            selectbackground=self.style["selectbackground"],
-            selectforeground=self.style["selectforeground"],
-            foreground=self.style["foreground"],
-            font=("Cascadia Mono", 9, "normal"),
-            relief="flat",
-        )
-
-        self.render.insert("insert", "This is a normal text for test style.")
-        self.render.tag_add("select", "1.31", "1.36")
-        self.render.tag_config(
-            "select", background=self.style["selectbackground"], foreground=self.style["selectforeground"]
+        self.render = Terminal(self, style=self.style, font=("Cascadia Mono", 9, "normal"))
+        self.render.text.config(width=40)
+        self.render.text.insert(
+            "end-1c",
+            "git status\n"
+            "On branch main\n"
+            "Changes not staged for commit:\n"
+            "        modified:   tktermwidget/style.py\n"
+            f"{Path.cwd()}{SIGN}python --version\n"
+            "Python 3.11.4\n"
+            f"{Path.cwd()}{SIGN}echo This is a normal text for test style.\n"
+            "This is a normal text for test style.\n"
+            f"{Path.cwd()}{SIGN} ",
         )
-        self.render["state"] = "disable"
+        self.render.text.tag_add("select", "end-2l+31c", "end-2l+36c")
+        self.render.text.tag_add("cursor", "end-2c")
+        self.render.text["state"] = "disable"
+        self.updaterender()
 
         # add the theme to the button widgets if usetheme == True
         if usetheme:
@@ -184,12 +151,17 @@ class Config(Tk):
                 widget.config(style="Accent.TButton", width=2, text="🎨")
             save.config(style="Accent.TButton")
 
-        # fill the entry with hexcolor before pack
-        for widget, hexcolor in zip(
+        # fill the entry with hexcolor and check it when it changes
+        self.variables: dict[str, StringVar] = {}
+        self.entries: dict[str, Entry] = {}
+        for widget, name in zip(
             (backgroundentry, insertbackgroundentry, selectbackgroundentry, selectforegroundentry, foregroundentry),
-            self.style.values(),
+            ("background", "insertbackground", "selectbackground", "selectforeground", "foreground"),
         ):
-            widget.insert("insert", hexcolor)
+            self.entries[name] = widget
+            self.variables[name] = StringVar(self, self.style[name])
+            widget.config(textvariable=self.variables[name])
+            self.variables[name].trace_add("write", lambda *_, widget=widget, name=name: self.checkhexcolor(widget, name))
 
         # Pack the widgets
         cancel.pack(side="right", padx=1)
@@ -218,12 +190,6 @@ class Config(Tk):
         ):
             widget.pack(side="left", padx=3)
 
-        backgroundentry.bind("<KeyPress>", lambda event: self.checkhexcolor(event, "background"))
-        insertbackgroundentry.bind("<KeyPress>", lambda event: self.checkhexcolor(event, "insertbackground"))
-        selectbackgroundentry.bind("<KeyPress>", lambda event: self.checkhexcolor(event, "selectbackground"))
-        selectforegroundentry.bind("<KeyPress>", lambda event: self.checkhexcolor(event, "selectforeground"))
-        foregroundentry.bind("<KeyPress>", lambda event: self.checkhexcolor(event, "foreground"))
-
         for widget in (
             backgroundframe,
             insertbackgroundframe,
@@ -233,31 +199,42 @@ class Config(Tk):
         ):
             widget.pack(side="top", fill="y", pady=3)
 
-    def selectcolor(self, entry: Entry, name: str) -> None:
+    def selectcolor(self, name: str) -> None:
         """Select the color in the gui and insert it into the
-        entry, also update the render with the lastest style"""
-        color = askcolor()[-1]  # get the hex color
-        entry.delete(0, "end")
-        entry.insert("insert", color)
-        self.style[name] = color  # store the hex color and the color name
-        self.updaterender()  # update the render to show the latest style
+        entry, the entry will update the render with the lastest style"""
+        color = askcolor(self.style[name], parent=self)[-1]  # get the hex color
+        if color is None:  # The dialog was cancelled
+            return
+        self.variables[name].set(color)
+
+    def queuerender(self) -> None:
+        """Render the latest style once the changes stop"""
+        if self.rendering:
+            self.after_cancel(self.rendering)
+        self.rendering = self.after(RENDER_DELAY, self.updaterender)
 
     def updaterender(self) -> None:
         """Let the render show with the latest style"""
-        self.render.config(
+        self.rendering = None
+        self.render.text.config(
             background=self.style["background"],
             insertbackground=self.style["insertbackground"],
             selectbackground=self.style["selectbackground"],
             selectforeground=self.style["selectforeground"],
             foreground=self.style["foreground"],
         )
-        self.render.tag_config(
+        self.render.text.tag_config(
             "select", background=self.style["selectbackground"], foreground=self.style["selectforeground"]
         )
-        self.update()
+        self.render.text.tag_config("cursor", background=self.style["insertbackground"])
 
     def savestyle(self) -> None:
         """Save the style"""
+        for entry in self.entries.values():
+            if entry.instate(["invalid"]):  # Don't save a color the user didn't finish
+                self.bell()
+                entry.focus_set()
+                return
         write_style(
             background=self.style["background"],
             insertbackground=self.style["insertbackground"],
@@ -267,14 +244,22 @@ class Config(Tk):
         )
         self.destroy()
 
-    def checkhexcolor(self, event: Event, name: str) -> None:
+    def destroy(self) -> None:
+        """Cancel the render left before destroying the window"""
+        if self.rendering:
+            self.after_cancel(self.rendering)
+            self.rendering = None
+        super().destroy()
+
+    def checkhexcolor(self, entry: Entry, name: str) -> None:
         """Check the hex color"""
-        if match(r"^#(?:[0-9a-fA-F]{3}){1,2}$", event.widget.get()):
-            event.widget.state(["invalid"])
-            self.style[name] = event.widget.get()
-            self.updaterender()
+        color = self.variables[name].get()
+        if match(r"^#(?:[0-9a-fA-F]{3}){1,2}$", color):
+            entry.state(["!invalid"])
+            self.style[name] = color
+            self.queuerender()
         else:
-            event.widget.state(["!invalid"])
+            entry.state(["invalid"])
 
 
 CUSTOM: dict[str] = load_style()
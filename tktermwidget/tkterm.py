@@ -1,33 +1,61 @@
 """Terminal widget for tkinter"""
 from __future__ import annotations
 
+from codecs import getincrementaldecoder
+from collections.abc import Callable
+from html import escape
+from locale import getpreferredencoding
 from os import getcwd
 from pathlib import Path
 from platform import system
-from subprocess import PIPE, Popen
-from tkinter import Event, Misc, Text
+from queue import Full, Queue
+from re import DOTALL
+from re import compile as recompile
+from subprocess import DEVNULL, PIPE, STDOUT, Popen
+from threading import Thread
+from time import monotonic
+from tkinter import Event, Misc, TclError, Text
+from tkinter.messagebox import askyesno
 from tkinter.ttk import Frame, Scrollbar
 
 from platformdirs import user_cache_dir
 
-dev: bool = False
+dev: bool = not __package__  # Run from inside the package directory
 if dev:
-    from style import DEFAULT
+    from constants import DEFAULT
 else:
-    from .style import DEFAULT # noqa: F401
+    from .constants import DEFAULT
 
 # Set constants
 HISTORY_PATH = Path(user_cache_dir("tktermwidget"))
 HISTORY_FILE = HISTORY_PATH / "history.txt"
 SYSTEM = system()
+ENCODING = getpreferredencoding(False)
 if SYSTEM == "Windows":
-    from subprocess import CREATE_NEW_CONSOLE
+    from subprocess import CREATE_NEW_CONSOLE, CREATE_NEW_PROCESS_GROUP, CREATE_NO_WINDOW
 
     SIGN = ">"
 else:
-    CREATE_NEW_CONSOLE = 0
+    from os import killpg
+    from signal import SIGKILL
+
+    CREATE_NEW_CONSOLE = CREATE_NEW_PROCESS_GROUP = CREATE_NO_WINDOW = 0
     SIGN = "$ "
 
+PASTE_CHUNK = 4096  # Characters inserted per slice when pasting
+PASTE_DELAY = 1  # Milliseconds between two paste slices
+EXPORT_CHUNK = 1000  # Lines read from the text widget per slice when exporting
+EXPORT_CHARS = 1 << 20  # Characters read from the text widget per slice at most, for very long lines
+EXPORT_QUEUE = 8  # Chunks waiting to be written, bounds the memory used by an export
+EXPORT_DELAY = 5  # Milliseconds between two export slices
+JOB_DELAY = 10  # Milliseconds between two polls of the running jobs
+JOB_READ = 4096  # Bytes read from the output of a job at once
+JOB_QUEUE = 16  # Chunks read ahead from the output of a job, the process waits when it is full
+JOB_EMIT = 32768  # Characters of output inserted per job and per poll
+JOB_GRACE = 0.2  # Seconds to wait for the output once the shell exited (its children may keep the pipe open)
+LIMIT = recompile(r"limit((?:\s+(?:timeout=\d+(?:\.\d+)?|cpu=\d+|memory=\d+))*)\s+(.+)", DOTALL)  # limit builtin
+ANSI = recompile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")  # ANSI escape codes
+
 # Check that the history directory exists
 if not HISTORY_PATH.exists():
     HISTORY_PATH.mkdir(parents=True)
@@ -56,6 +84,165 @@ class AutoHideScrollbar(Scrollbar):
         Scrollbar.set(self, first, last)
 
 
+class Job:
+    """A command running in the terminal
+
+    Args:
+        id (int): The job number shown by "jobs"
+        cmd (str): The command
+        process (Popen): The process running the command (leader of its own process group)
+        background (bool): Whether the job runs in the background
+        timeout (float | None): Seconds before the job is killed"""
+
+    def __init__(self, id: int, cmd: str, process: Popen, background: bool, timeout: float | None):
+        self.id = id
+        self.cmd = cmd
+        self.process = process
+        self.background = background
+        self.deadline: float | None = monotonic() + timeout if timeout else None
+        self.killed: bool = False
+        self.timedout: bool = False
+        self.exited: float | None = None  # When the shell was seen exited
+        self.detached: bool = False  # The job is finished, drop what its children still write
+        self.partial: str = ""  # Output without a trailing newline yet
+        self.output: Queue = Queue(JOB_QUEUE)
+        self.input: Queue = Queue()
+        self.reader = Thread(target=self.read, daemon=True)
+        self.reader.start()
+        self.writer = Thread(target=self.send, daemon=True)
+        self.writer.start()
+
+    def read(self) -> None:
+        """Read the output of the process (runs in a thread)"""
+        decoder = getincrementaldecoder(ENCODING)("replace")
+        while chunk := self.process.stdout.read1(JOB_READ):
+            data = decoder.decode(chunk)
+            while not self.detached:
+                try:
+                    self.output.put(data, timeout=JOB_GRACE)
+                    break
+                except Full:  # Wait for the terminal, unless the job gets finished
+                    continue
+        if not self.detached:
+            self.output.put(decoder.decode(b"", True))
+        self.process.stdout.close()
+
+    def send(self) -> None:
+        """Write the input to the stdin of the process (runs in a thread)"""
+        while (data := self.input.get()) is not None:
+            try:
+                self.process.stdin.write(data.encode(ENCODING))
+                self.process.stdin.flush()
+            except OSError:  # The process doesn't read its stdin anymore
+                break
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+    def flush(self, everything: bool = False) -> str:
+        """Get some of the output read so far (only the complete lines unless everything is True)"""
+        chunks: list[str] = [self.partial]
+        size = len(self.partial)
+        while size < JOB_EMIT and not self.output.empty():
+            chunks.append(self.output.get_nowait())
+            size += len(chunks[-1])
+        data = "".join(chunks).replace("\r\n", "\n")
+        if everything or size >= JOB_EMIT:
+            self.partial = ""
+            return data
+        cut = data.rfind("\n") + 1
+        self.partial = data[cut:]
+        return data[:cut]
+
+    def write(self, data: str) -> None:
+        """Write to the stdin of the process without waiting for it to read"""
+        self.input.put(data)
+
+    def kill(self) -> None:
+        """Kill the whole process group of the job"""
+        if SYSTEM == "Windows":
+            Popen(
+                ["taskkill", "/F", "/T", "/PID", str(self.process.pid)],
+                stdout=DEVNULL,
+                stderr=DEVNULL,
+                creationflags=CREATE_NO_WINDOW,
+            )
+        else:
+            try:
+                killpg(self.process.pid, SIGKILL)
+            except (ProcessLookupError, PermissionError):  # Already gone
+                pass
+
+    def running(self) -> bool:
+        """Whether the shell or a process still holding its output is running"""
+        return self.process.poll() is None or self.reader.is_alive()
+
+    def done(self) -> bool:
+        """Whether the process exited and its output has been shown
+
+        A child left running in the background (like "sleep 100 & echo hi") can keep the output open,
+        so the job is also done shortly after the shell exited."""
+        if self.process.poll() is None or not self.output.empty():
+            return False
+        if not self.reader.is_alive():
+            return True
+        if self.exited is None:
+            self.exited = monotonic()
+        return monotonic() - self.exited > JOB_GRACE
+
+    def status(self) -> str:
+        """The status shown by "jobs" and when the job ends"""
+        if self.timedout:
+            return "Timed out"
+        if self.killed:
+            return "Killed"
+        if self.process.returncode is None:
+            return "Running"
+        return "Done" if self.process.returncode == 0 else f"Exit {self.process.returncode}"
+
+
+class Export:
+    """A scrollback export running in the terminal
+
+    Args:
+        path (Path): The file to write
+        mode (str): "text", "ansi" or "html"
+        chunksize (int): Lines read from the text widget per slice
+        progress (Callable[[int, int], None] | None): Called with the lines read and the total lines
+        callback (Callable[[Exception | None], None] | None): Called when the export is done"""
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str,
+        chunksize: int,
+        progress: Callable[[int, int], None] | None,
+        callback: Callable[[Exception | None], None] | None,
+    ):
+        self.path = path
+        self.mode = mode
+        self.chunksize = chunksize
+        self.progress = progress
+        self.callback = callback
+        self.chunks: Queue = Queue(EXPORT_QUEUE)
+        self.errors: list[Exception] = []
+        self.mark = f"export{id(self)}"
+        self.read: int = 0  # Lines read so far
+        self.after: str | None = None  # The next slice scheduled
+        self.writer: Thread | None = None
+
+    def abort(self, error: Exception) -> None:
+        """Stop the writer without waiting for it and report the error"""
+        self.errors.append(error)
+        # Only the writer takes from the queue, so it has room for the end once emptied
+        while not self.chunks.empty():
+            self.chunks.get_nowait()
+        self.chunks.put_nowait(None)
+        if self.callback:
+            self.callback(error)
+
+
 class Terminal(Frame):
     """A terminal widget for tkinter applications
 
@@ -64,10 +251,15 @@ class Terminal(Frame):
         autohide (bool, optional): Whether to autohide the scrollbars.
         (Set true to enable it.)
         *args: Arguments for the text widget
+        timeout (float, optional): Seconds before a job is killed (keyword only)
+        cpulimit (int, optional): Seconds of CPU time a job can use (keyword only, not on Windows)
+        memlimit (int, optional): Bytes of memory a job can use, at least 1024 (keyword only, not on Windows)
+        (The "limit timeout=... cpu=... memory=... command" builtin overrides them for one job)
         **kwargs: Keyword arguments for the text widget
 
     Methods for outside use:
-        None
+        export (str | Path, str, ...) -> None: Exports the scrollback to a file ("text", "ansi" or "html")
+        killjobs () -> None: Kills every job (also called when the terminal is destroyed)
 
     Methods for internal use:
         up (Event) -> str: Goes up in the history
@@ -75,8 +267,23 @@ class Terminal(Frame):
         (If the user is at the bottom of the history, it clears the command)
         left (Event) -> str: Goes left in the command if the index is greater than the directory
         (So the user can't delete the directory or go left of it)
-        kill (Event) -> str: Kills the current command
-        loop (Event) -> str: Runs the command typed"""
+        kill (Event) -> str: Kills the foreground job (or stops waiting for the background jobs)
+        loop (Event) -> str: Runs the command typed (or sends it to the foreground job, ignored while pasting)
+        paste (Event) -> str: Pastes the clipboard (in chunks, as a batch or into the job's stdin)
+        pastechunk (str, int) -> None: Inserts a slice of a large paste and schedules the next one
+        stoppaste () -> None: Cancels the slices of the paste left
+        batch (list[str]) -> None: Runs several commands one after another with one history write
+        execute (str) -> None: Runs a builtin ("jobs", "fg", "wait", "kill %n", "limit", ...) or starts a job
+        checklimit (str) -> bool: Checks the options of the limit builtin
+        start (str, bool, ...) -> Job: Starts a job (in its own process group)
+        next () -> None: Runs the next command of the batch or shows the prompt
+        poll () -> None: Shows the output of the jobs and finishes the ended ones
+        emit (str) -> None: Inserts output (above the prompt when no job is in the foreground)
+        finish (Job) -> None: Cleans up an ended job
+        exportchunk (Export) -> None: Reads a range of lines for the export and schedules the next one
+        exportend (Export) -> None: Tells the export writer to finish
+        exportwait (Export) -> None: Waits for the export writer to finish
+        exportwrite (Export) -> None: Writes the exported chunks to the file (runs in a thread)"""
 
     def __init__(
         self,
@@ -85,9 +292,14 @@ class Terminal(Frame):
         filehistory: str = None,
         autohide: bool = False,
         *args,
+        timeout: float | None = None,
+        cpulimit: int | None = None,
+        memlimit: int | None = None,
         **kwargs,
     ):
         Frame.__init__(self, master)
+        if memlimit is not None and memlimit < 1024:
+            raise ValueError(f"memlimit must be at least 1024 bytes, not {memlimit!r}")
 
         # Set row and column weights
         self.rowconfigure(0, weight=1)
@@ -133,7 +345,16 @@ class Terminal(Frame):
 
         # Set variables
         self.longflag: bool = False
-        self.current_process: Popen | None = None
+        self.jobs: dict[int, Job] = {}
+        self.foreground: Job | None = None
+        self.waiting: set[int] = set()  # Background jobs "wait" is waiting for
+        self.pending: list[str] = []  # Commands of the batch left to run
+        self.polling: str | None = None
+        self.pasting: str | None = None
+        self.exports: list[Export] = []
+        self.timeout: float | None = timeout
+        self.cpulimit: int | None = cpulimit
+        self.memlimit: int | None = memlimit
         self.index: int = 1
         self.cursor: int = self.text.index("insert")
         self.longsymbol: str = "\\" if not SYSTEM == "Windows" else "&&"
@@ -150,7 +371,8 @@ class Terminal(Frame):
             self.text.bind(bind_str, self.left, add=True)
         for bind_str in ("<Return>", "<ButtonRelease-1>"):
             self.text.bind(bind_str, self.check, add=True)
-        self.text.bind("<Control-KeyPress-c>", self.kill, add=True)  # Isn't working
+        self.text.bind("<Control-KeyPress-c>", self.kill, add=True)
+        self.text.bind("<<Paste>>", self.paste, add=True)
 
         # History recorder
         self.history = open(
@@ -217,14 +439,22 @@ class Terminal(Frame):
             return "break"
 
     def kill(self, _: Event) -> str:
-        """Kill the current process"""
-        if self.current_process:
-            self.current_process.kill()
-            self.current_process = None
+        """Kill the foreground job"""
+        self.stoppaste()
+        if self.foreground:
+            self.pending = []  # Cancel the rest of the batch too
+            self.foreground.killed = True
+            self.foreground.kill()
+        elif self.waiting:  # Stop waiting, the background jobs keep running
+            self.waiting = set()
+            self.emit("\n")
+            self.next()
         return "break"
 
     def update(self) -> str:
         """Update or the command has no output"""
+        self.text.mark_set("insert", "end-1c")
+        self.index = int(self.text.index("end-1c").split(".")[0])
         self.directory()
         self.check(None)
         self.latest = self.text.index("insert")
@@ -233,6 +463,18 @@ class Terminal(Frame):
 
     def loop(self, _: Event) -> str:
         """Create an input loop"""
+        if self.pasting:  # Never run a command that is only partly pasted
+            self.bell()
+            return "break"
+        if self.foreground or self.waiting:
+            # A job is running, the line is its input
+            line = self.text.get(self.latest, "end-1c")
+            self.text.insert("end-1c", "\n")
+            self.latest = self.text.index("end-1c")
+            if self.foreground:
+                self.foreground.write(line + "\n")
+            return "break"
+
         # Get the command from the text
         cmd = self.text.get(f"{self.index}.0", "end-1c")
         cmd = cmd.split(SIGN)[-1].strip()
@@ -259,54 +501,408 @@ class Terminal(Frame):
             self.text.see("end")
             return "break"
 
+        self.text.insert("end-1c", "\n")
+        self.index = int(self.text.index("end-1c").split(".")[0])  # The output goes after the command
+        self.latest = self.text.index("end-1c")
+        self.execute(cmd)
+        return "break"  # Prevent the default newline character insertion
+
+    def execute(self, cmd: str) -> None:
+        """Run the command"""
+        name, *params = cmd.split()
+        ids = [int(param.lstrip("%")) for param in params if param.lstrip("%").isdigit()]
+
         # Check the command if it is a special command
         if cmd in ["clear", "cls"]:
             self.text.delete("1.0", "end")
-            self.directory()
-            return "break"
         elif cmd == "exit":
+            self.killjobs()
             self.master.quit()
-
-        # Check that the insert position is at the end
-        if self.text.index("insert") != f"{self.index}.end":
-            self.text.mark_set("insert", f"{self.index}.end")
-            self.text.see("insert")
-
-        # TODO: Refactor the way we get output from subprocess
-        # Run the command
-        self.current_process = Popen(
-            cmd,
+        elif cmd == "jobs":
+            self.emit("".join(f"[{job.id}]  {job.status()}  {job.cmd}\n" for job in self.jobs.values()))
+        elif name == "fg":
+            job = self.jobs.get(ids[0] if ids else max(self.jobs, default=0))
+            if job:
+                job.background = False
+                self.foreground = job
+                self.waiting.discard(job.id)
+                self.emit(job.cmd + "\n")
+                return
+            self.emit("fg: no such job\n")
+        elif name == "wait":
+            self.waiting = {jobid for jobid in (ids or self.jobs) if jobid in self.jobs}
+            if self.waiting:
+                return
+        elif name == "kill" and params and all(param.startswith("%") for param in params):
+            for jobid in ids:
+                if jobid in self.jobs:
+                    self.jobs[jobid].killed = True
+                    self.jobs[jobid].kill()
+                else:
+                    self.emit(f"kill: %{jobid}: no such job\n")
+        elif name == "limit" and not self.checklimit(cmd):
+            self.emit("limit: usage: limit [timeout=seconds] [cpu=seconds] [memory=bytes (at least 1024)] command\n")
+        else:
+            limits: dict[str, str] = {}
+            if name == "limit":
+                found = LIMIT.fullmatch(cmd)
+                limits = dict(option.split("=") for option in found[1].split())
+                cmd = found[2].strip()
+            background = cmd.endswith("&") and not cmd.endswith("&&")
+            job = self.start(
+                cmd[:-1].strip() if background else cmd,
+                background,
+                float(limits["timeout"]) if "timeout" in limits else None,
+                int(limits["cpu"]) if "cpu" in limits else None,
+                int(limits["memory"]) if "memory" in limits else None,
+            )
+            if not background:
+                self.foreground = job
+                return
+            self.emit(f"[{job.id}] {job.process.pid}\n")
+        self.next()
+
+    def checklimit(self, cmd: str) -> bool:
+        """Check the options of the limit builtin"""
+        found = LIMIT.fullmatch(cmd)
+        if not found:
+            return False
+        limits = dict(option.split("=") for option in found[1].split())
+        return "memory" not in limits or int(limits["memory"]) >= 1024
+
+    def start(
+        self,
+        cmd: str,
+        background: bool,
+        timeout: float | None = None,
+        cpulimit: int | None = None,
+        memlimit: int | None = None,
+    ) -> Job:
+        """Start a job in its own process group (the limits default to the terminal ones)"""
+        timeout = self.timeout if timeout is None else timeout
+        cpulimit = self.cpulimit if cpulimit is None else cpulimit
+        memlimit = self.memlimit if memlimit is None else memlimit
+        if memlimit is not None and memlimit < 1024:
+            raise ValueError(f"memlimit must be at least 1024 bytes, not {memlimit!r}")
+
+        shell = cmd
+        if SYSTEM != "Windows" and (cpulimit or memlimit):
+            # Let the shell apply the limits before running the command
+            limits = [f"ulimit -t {cpulimit}"] if cpulimit else []
+            limits += [f"ulimit -v {-(-memlimit // 1024)}"] if memlimit else []  # In KiB, rounded up
+            shell = " && ".join(limits) + f" && {{\n{cmd}\n}}"
+
+        process = Popen(
+            shell,
             shell=True,
             stdout=PIPE,
-            stderr=PIPE,
+            stderr=STDOUT,
             stdin=PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True,
             cwd=getcwd(),  # TODO: use dynamtic path instead (see #35)
-            creationflags=CREATE_NEW_CONSOLE,
+            creationflags=CREATE_NEW_CONSOLE | CREATE_NEW_PROCESS_GROUP,
+            start_new_session=SYSTEM != "Windows",
         )
-        # The following needs to be put in an after so the kill command works
-
-        # Check if the command was successful
-        output: tuple = self.current_process.communicate()
-        returnlines: str = output[0]
-        errors: str = output[1]
-        returncode = self.current_process.returncode
-        self.current_process = None
-        if returncode != 0:
-            returnlines += errors  # If the command was unsuccessful, it doesn't give stdout
-        # TODO: Get the success message from the command (see #16)
-        # Output to the text
-        self.newline()
-        for line in returnlines:
-            self.text.insert("insert", line)
-            if line == "\n":
-                self.index += 1
-
-        # Update the text and the index
-        self.update()
-        return "break"  # Prevent the default newline character insertion
+        job = Job(max(self.jobs, default=0) + 1, cmd, process, background, timeout)
+        self.jobs[job.id] = job
+        if not self.polling:
+            self.polling = self.after(JOB_DELAY, self.poll)
+        return job
+
+    def next(self) -> None:
+        """Run the next command of the batch or show the prompt"""
+        if not self.pending:
+            self.update()
+            return
+        cmd = self.pending.pop(0)
+        self.text.insert("end-1c", getcwd() + SIGN + cmd + "\n")
+        self.index = int(self.text.index("end-1c").split(".")[0])  # The output goes after the command
+        self.latest = self.text.index("end-1c")
+        self.text.see("end")
+        self.execute(cmd)
+
+    def poll(self) -> None:
+        """Show the output of the jobs and finish the ended ones"""
+        for job in list(self.jobs.values()):
+            if job.deadline and monotonic() > job.deadline and job.running():
+                job.timedout = True
+                job.deadline = None
+                job.kill()
+            output = job.flush(job is self.foreground or not job.reader.is_alive())
+            if output:
+                self.emit(output)
+            if job.done():
+                self.finish(job)
+        self.polling = self.after(JOB_DELAY, self.poll) if self.jobs else None
+
+    def emit(self, output: str) -> None:
+        """Insert the output"""
+        if self.foreground or self.waiting or self.pending:
+            # No prompt, the output goes at the end
+            self.text.insert("end-1c", output)
+            self.latest = self.text.index("end-1c")
+        else:
+            # Keep the prompt and what is typed after it at the bottom, on its own line
+            if not output.endswith("\n"):
+                output += "\n"
+            column = self.latest.split(".")[1]
+            self.text.insert(f"{self.index}.0", output)
+            self.index += output.count("\n")
+            self.latest = f"{self.index}.{column}"
+        self.text.see("end")
+
+    def finish(self, job: Job) -> None:
+        """Show the last output of the job and remove it"""
+        del self.jobs[job.id]
+        job.detached = True  # Children left in the background can't block the reader
+        job.input.put(None)  # Stop the stdin writer
+        output = job.flush(True)
+        if output and not output.endswith("\n"):
+            output += "\n"
+        if job.background or job.timedout:
+            output += f"[{job.id}]  {job.status()}  {job.cmd}\n"
+        if output:
+            self.emit(output)
+
+        if job is self.foreground:
+            self.foreground = None
+            if self.text.get("end-2c") != "\n":
+                self.text.insert("end-1c", "\n")
+            self.next()
+        elif job.id in self.waiting:
+            self.waiting.discard(job.id)
+            if not self.waiting:
+                self.next()
+
+    def killjobs(self) -> None:
+        """Kill every job"""
+        for job in self.jobs.values():
+            job.killed = True
+            job.kill()
+
+    def destroy(self) -> None:
+        """Kill the jobs and stop the exports before destroying the terminal"""
+        self.stoppaste()
+        self.killjobs()
+        for export in self.exports:
+            if export.after:
+                self.after_cancel(export.after)
+            export.abort(RuntimeError("The terminal was destroyed during the export"))
+        self.exports = []
+        if self.polling:
+            self.after_cancel(self.polling)
+            self.polling = None
+        Frame.destroy(self)
+
+    def paste(self, _: Event) -> str:
+        """Paste the clipboard without freezing the terminal"""
+        try:
+            data: str = self.text.clipboard_get()
+        except TclError:  # Empty clipboard
+            return "break"
+        data = data.replace("\r\n", "\n").replace("\r", "\n")
+
+        if self.foreground:
+            # A job is reading input, give it the paste verbatim
+            self.foreground.write(data)
+            return "break"
+        if self.waiting:  # Nothing reads the input while waiting
+            self.bell()
+            return "break"
+
+        # Never paste into the output or the directory
+        if float(self.text.index("insert")) < float(self.latest):
+            self.text.mark_set("insert", "end-1c")
+
+        lines: list[str] = data.rstrip("\n").split("\n")
+        if len(lines) > 1 and askyesno("Paste", f"Run the {len(lines)} pasted lines as commands?", parent=self):
+            self.stoppaste()
+            self.batch(lines)
+            return "break"
+
+        # Insert the paste as it is, the shell runs every line of it
+        self.stoppaste()
+        self.text.mark_set("paste", "insert")
+        self.pastechunk("\n".join(lines), 0)
+        return "break"
+
+    def pastechunk(self, data: str, start: int) -> None:
+        """Insert a slice of the paste and schedule the rest"""
+        self.text.insert("paste", data[start : start + PASTE_CHUNK])
+        self.text.see("paste")
+        if start + PASTE_CHUNK < len(data):
+            self.pasting = self.after(PASTE_DELAY, self.pastechunk, data, start + PASTE_CHUNK)
+        else:
+            self.pasting = None
+            self.text.mark_unset("paste")
+
+    def stoppaste(self) -> None:
+        """Cancel the slices of the paste left"""
+        if self.pasting:
+            self.after_cancel(self.pasting)
+            self.pasting = None
+            self.text.mark_unset("paste")
+
+    def batch(self, lines: list[str]) -> None:
+        """Run several commands one after another and write the history only once
+
+        The output isn't buffered for one insertion at the end of the batch: every command
+        shows its output as it comes, so the memory used stays bounded and the output is live."""
+        # Join the lines which end with the long symbol
+        cmds: list[str] = []
+        longcmd: str = self.longcmd + self.text.get(f"{self.index}.0", "end-1c").split(SIGN)[-1]
+        self.longcmd = ""
+        self.longflag = False
+        for line in lines:
+            longcmd += line
+            if longcmd.strip().endswith(self.longsymbol):
+                longcmd = longcmd.strip()[: -len(self.longsymbol)]
+                continue
+            cmds.append(longcmd.strip())
+            longcmd = ""
+        if longcmd.strip():
+            cmds.append(longcmd.strip())
+        cmds = [cmd for cmd in cmds if cmd]
+        if not cmds:
+            return
+
+        # Record all the commands with one write
+        self.history.write("".join(cmd + "\n" for cmd in cmds))
+        self.historys.extend(cmds)
+        self.historyindex = len(self.historys) - 1
+
+        # Run the commands one after another
+        self.text.delete(f"{self.index}.0", "end-1c")
+        self.pending = cmds
+        self.next()
+
+    def export(
+        self,
+        path: str | Path,
+        mode: str = "text",
+        progress: Callable[[int, int], None] | None = None,
+        callback: Callable[[Exception | None], None] | None = None,
+        chunksize: int = EXPORT_CHUNK,
+    ) -> None:
+        """Export the scrollback to a file without blocking the terminal
+
+        The export isn't a snapshot: it covers the text between two marks placed when it starts,
+        so output inserted before the part already read is left out and output inserted after it is kept.
+
+        Args:
+            path (str | Path): The file to write
+            mode (str, optional): "text" strips the ANSI codes, "ansi" keeps them
+            and "html" writes a page styled with the terminal style
+            progress (Callable[[int, int], None], optional): Called with the lines read and the total lines
+            callback (Callable[[Exception | None], None], optional): Called when the export is done
+            (with the error if it failed)
+            chunksize (int, optional): Lines read from the text widget per slice"""
+        if mode not in ("text", "ansi", "html"):
+            raise ValueError(f"Unknown export mode: {mode!r}")
+        if chunksize <= 0:
+            raise ValueError(f"chunksize must be positive, not {chunksize!r}")
+
+        export = Export(Path(path), mode, chunksize, progress, callback)
+        self.text.mark_set(f"{export.mark}start", "1.0")
+        self.text.mark_set(f"{export.mark}end", "end-1c")
+        # Text inserted at the marks goes after them: kept at the start, left out at the end
+        self.text.mark_gravity(f"{export.mark}start", "left")
+        self.text.mark_gravity(f"{export.mark}end", "left")
+        export.writer = Thread(target=self.exportwrite, args=(export,), daemon=True)
+        export.writer.start()
+        self.exports.append(export)
+        self.exportchunk(export)
+
+    def exportchunk(self, export: Export) -> None:
+        """Read the next range of lines and give it to the writer"""
+        start, end = f"{export.mark}start", f"{export.mark}end"
+        if export.errors or self.text.compare(start, ">=", end):  # The writer failed or everything is read
+            self.text.mark_unset(start, end)
+            self.exportend(export)
+            return
+        if export.chunks.full():  # The writer is busy, try again later
+            export.after = self.after(EXPORT_DELAY, self.exportchunk, export)
+            return
+
+        # Stop after chunksize lines, EXPORT_CHARS characters or at the end, the first of them
+        stop = min(
+            (
+                self.text.index(f"{start} + {export.chunksize} lines linestart"),
+                self.text.index(f"{start} + {EXPORT_CHARS} chars"),
+                self.text.index(end),
+            ),
+            key=lambda index: tuple(map(int, index.split("."))),
+        )
+        startline = int(self.text.index(start).split(".")[0])
+        stopline, stopcolumn = map(int, stop.split("."))
+        export.chunks.put_nowait(self.text.get(start, stop))
+        self.text.mark_set(start, stop)
+
+        # Count the lines ended by this slice, and the last line when it reaches the end
+        finished = self.text.compare(start, ">=", end)
+        export.read += stopline - startline + (1 if finished and stopcolumn else 0)
+        if export.progress:
+            endline, endcolumn = map(int, self.text.index(end).split("."))
+            left = 0 if finished else endline - stopline + (1 if endcolumn else 0)
+            export.progress(export.read, export.read + left)
+        export.after = self.after(EXPORT_DELAY, self.exportchunk, export)
+
+    def exportend(self, export: Export) -> None:
+        """Tell the writer to finish without blocking"""
+        if export.writer.is_alive() and export.chunks.full():
+            export.after = self.after(EXPORT_DELAY, self.exportend, export)
+            return
+        if export.writer.is_alive():
+            export.chunks.put_nowait(None)
+        self.exportwait(export)
+
+    def exportwait(self, export: Export) -> None:
+        """Wait for the writer without blocking and call the callback"""
+        if export.writer.is_alive():
+            export.after = self.after(EXPORT_DELAY, self.exportwait, export)
+            return
+        export.after = None
+        self.exports.remove(export)
+        if export.callback:
+            export.callback(export.errors[0] if export.errors else None)
+
+    def exportwrite(self, export: Export) -> None:
+        """Write the chunks to the file"""
+        mode, chunks = export.mode, export.chunks
+        finished: bool = False
+        carry: str = ""  # An escape code cut by the end of a chunk
+        try:
+            with open(export.path, "w", encoding="utf-8", newline="") as file:
+                if mode == "html":
+                    file.write(
+                        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<style>\n'
+                        f"pre {{ background: {self.style['background']}; color: {self.style['foreground']}; "
+                        f"caret-color: {self.style['insertbackground']}; font-family: monospace; "
+                        "white-space: pre-wrap; margin: 0; padding: 4px; }\n"
+                        f"pre::selection {{ background: {self.style['selectbackground']}; "
+                        f"color: {self.style['selectforeground']}; }}\n"
+                        "</style>\n</head>\n<body>\n<pre>"
+                    )
+                while (chunk := chunks.get()) is not None:
+                    chunk = carry + chunk
+                    cut = chunk.rfind("\x1b")
+                    if cut != -1 and len(chunk) - cut < 64 and not ANSI.match(chunk, cut):
+                        chunk, carry = chunk[:cut], chunk[cut:]
+                    else:
+                        carry = ""
+                    if mode != "ansi":
+                        chunk = ANSI.sub("", chunk)
+                    if mode == "html":
+                        chunk = escape(chunk)
+                    file.write(chunk)
+                finished = True
+                file.write(escape(carry) if mode == "html" else carry)
+                if mode == "html":
+                    file.write("</pre>\n</body>\n</html>\n")
+        except Exception as error:  # noqa: BLE001 # Report every error, the callback would think it succeeded
+            export.errors.append(error)
+            # Drain the queue so the reader never waits for us
+            while not finished and chunks.get() is not None:
+                pass
 
 
 if __name__ == "__main__":